@@ -87,6 +87,8 @@ class BotConfig:
     MAX_MEMORY_USAGE_MB: int = 500  # Yeni: Memory limit
     MAX_FILE_SIZE_MB: int = 200  # Yeni: Max dosya boyutu
     BATCH_PROCESSING_SIZE: int = 1000  # Yeni: Batch boyutu
+    # Geliştirme: derlenmiş utils/_splitter_core yoksa import sırasında pyximport ile derle
+    SPLITTER_PYXIMPORT: bool = field(default_factory=lambda: os.getenv("SPLITTER_PYXIMPORT", "False").lower() == "true")
 
 
 @dataclass
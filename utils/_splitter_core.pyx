@@ -0,0 +1,52 @@
+# utils/_splitter_core.pyx
+# cython: language_level=3
+# ExcelSplitter satır dağıtım döngüsü (opsiyonel C hızlandırma)
+# excel_splitter.py içindeki ExcelSplitter._process_row_sync ile birebir aynı iş;
+# derlenmiş modül yoksa saf Python sürümü kullanılır
+# Önceden derleme: cythonize -i utils/_splitter_core.pyx
+
+cpdef Py_ssize_t dispatch_rows(list batch, dict city_cache, dict group_state,
+                               Py_ssize_t city_col, object lookup_city,
+                               object unmatched_group, Py_ssize_t shard_batch_rows,
+                               object flush_shard) except -1:
+    """
+    Dispatch a batch of rows to the group shard buffers.
+    Returns the number of matched (row, group) pairs.
+    """
+    cdef Py_ssize_t matched = 0
+    cdef object row, city, groups, group_id
+    cdef list state, pending
+
+    for row in batch:
+        # Kısa satırda şehir yok (boundscheck kapatılmamalı: IndexError gerekir)
+        try:
+            city = row[city_col]
+        except IndexError:
+            city = None
+
+        groups = city_cache.get(city)
+        if groups is None:
+            # Önbellek dolumu Python tarafında (group_manager)
+            groups = lookup_city(city)
+
+        # Eşleşme yoksa: şehir doluysa grup_0 shard'ına
+        if not groups:
+            if city:
+                state = <list>group_state[unmatched_group]
+                pending = <list>state[1]
+                pending.append(row)
+                state[3] += 1
+                if len(pending) >= shard_batch_rows:
+                    flush_shard(state)
+            continue
+
+        for group_id in <tuple>groups:
+            state = <list>group_state[group_id]
+            pending = <list>state[1]
+            pending.append(row)
+            state[3] += 1
+            if len(pending) >= shard_batch_rows:
+                flush_shard(state)
+        matched += len(<tuple>groups)
+
+    return matched
@@ -4,107 +4,421 @@
 # sutun genişliğini burda ayarlar
 
 import asyncio
+import gc
+import multiprocessing
+import os
+import pickle
+import queue
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 
+import psutil
 import xlsxwriter
+from xlsxwriter.worksheet import Worksheet
 from openpyxl import load_workbook
 
+try:
+    # Opsiyonel: Rust tabanlı okuyucu (sadece fast_read=True ile kullanılır)
+    from python_calamine import CalamineSheet, CalamineWorkbook
+    # iter_rows()/close() 0.3.0 ile geldi; eski sürümde openpyxl kullanılır
+    if not (hasattr(CalamineSheet, "iter_rows") and hasattr(CalamineWorkbook, "close")):
+        CalamineWorkbook = None
+except ImportError:
+    CalamineWorkbook = None
+
 from utils.group_manager import group_manager
 from utils.file_namer import generate_output_filename
 from utils.logger import logger
 from config import config
 
+# Opsiyonel: satır dağıtım döngüsünün Cython sürümü (utils/_splitter_core.pyx).
+# Sadece önceden derlenmiş modül kullanılır:
+#     cythonize -i utils/_splitter_core.pyx
+# Yoksa saf Python döngüsü. Import sırasında derleme (pyximport, ~/.pyxbld)
+# sadece geliştirme için, SPLITTER_PYXIMPORT=true ile açılır
+try:
+    from utils._splitter_core import dispatch_rows
+except ImportError:
+    dispatch_rows = None
+    if config.bot.SPLITTER_PYXIMPORT:
+        try:
+            import pyximport
+            py_importer, pyx_importer = pyximport.install(language_level=3)
+            try:
+                from utils._splitter_core import dispatch_rows
+            finally:
+                # Import hook'ları process genelinde kalmasın
+                pyximport.uninstall(py_importer, pyx_importer)
+        except Exception as e:
+            logger.debug(f"Cython satır döngüsü derlenemedi, Python sürümü: {e}")
+
+
+# Shard dosyasına tek seferde yazılan satır sayısı (RAM'de grup başına en fazla bu kadar)
+SHARD_BATCH_ROWS = 50_000
+# Shard dosyaları için I/O tamponu (okuma ve yazma)
+SHARD_BUFFER_SIZE = 1 << 20
+
+# Standard (bellek içi) modda hücre başına yaklaşık RAM kullanımı (byte)
+BYTES_PER_CELL = 60
+# Standard mod için kullanılabilir RAM'in en fazla bu oranı harcanır
+MEMORY_BUDGET_RATIO = 0.5
+
+# Okuyucu thread'den işleyici thread'e giden satır paketi boyutu ve kuyruk sınırı
+# (her paket sonunda toplu gen1 GC taraması)
+READ_BATCH_ROWS = 10_000
+READ_QUEUE_SIZE = 4
+# Satır döngüsü sırasında gen0 GC eşiği (varsayılan 700/2000 yerine).
+# GC ayarı thread'e değil tüm process'e uygulanır: otomatik GC kapanmaz, seyrekleşir
+GC_GEN0_THRESHOLD = 100_000
+
+# Shard'lar ve xlsxwriter geçici dosyaları için tercih edilen RAM disk (Linux tmpfs)
+TMPFS_DIR = Path("/dev/shm")
+# tmpfs'te en az (girdi dosyası boyutu x bu katsayı) boş alan yoksa diske düşülür
+TMPFS_SIZE_FACTOR = 10
+
+# Workbook worker process'leri çalışan bot process'inden fork edilmez
+# (aiogram/loguru thread'leri ve socket'ler devralınmasın)
+MP_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+UNMATCHED_GROUP = "grup_0"
+
+# Eş zamanlı split'ler eşiği paylaşır: ilk giren yükseltir, son çıkan geri alır
+_gc_lock = threading.Lock()
+_gc_users = 0
+_gc_saved_threshold: Optional[tuple] = None
+# Şehir sütunu (0 tabanlı)
+CITY_COL = 1
+
+
+def _raise_gc_threshold() -> None:
+    """Raise the process-wide gen0 GC threshold while a row loop runs."""
+    global _gc_users, _gc_saved_threshold
+    with _gc_lock:
+        if _gc_users == 0:
+            _gc_saved_threshold = gc.get_threshold()
+            gen0, *older = _gc_saved_threshold
+            gc.set_threshold(max(gen0, GC_GEN0_THRESHOLD), *older)
+        _gc_users += 1
+
+
+def _restore_gc_threshold() -> None:
+    """Restore the GC threshold once the last running row loop is done."""
+    global _gc_users, _gc_saved_threshold
+    with _gc_lock:
+        _gc_users -= 1
+        if _gc_users == 0:
+            gc.set_threshold(*_gc_saved_threshold)
+            _gc_saved_threshold = None
+
+
+class FastWorksheet(Worksheet):
+    """
+    Worksheet with a typed batch row writer for the common plain str/int/float cells.
+    Everything else (formulas, URLs, dates, bools, ...) goes through the
+    regular write() dispatch, so the output is identical to write_row().
+    """
+
+    def write_rows(self, row: int, rows) -> int:
+        """
+        Write consecutive data rows from column 0 starting at `row`, skipping
+        write()'s type dispatch when possible. Returns the next free row index.
+        """
+        write_string = self._write_string
+        write_number = self._write_number
+        write = self._write
+        for data in rows:
+            for col, value in enumerate(data):
+                value_type = value.__class__
+                if value_type is str:
+                    # Formül ("=", "{=") veya URL olabilecek string'ler genel yoldan
+                    if value and value[0] not in "={" and ":" not in value:
+                        error = write_string(row, col, value)
+                    else:
+                        error = write(row, col, value)
+                elif value_type is int or value_type is float:
+                    error = write_number(row, col, value)
+                elif value is None:
+                    # Formatsız boş hücre yazılmaz
+                    continue
+                else:
+                    error = write(row, col, value)
+
+                # write_row() ile aynı: ilk hatada satırın kalanı yazılmaz
+                if error:
+                    break
+            row += 1
+
+        return row
+
+
+def _write_group_workbook(file_path: str, sheet_name: str, headers: List[str],
+                          shard_path: str, constant_memory: bool = True,
+                          tmpdir: Optional[str] = None) -> int:
+    """Build one output workbook from a pickled row shard (runs in a worker process)."""
+    if constant_memory:
+        options = {'constant_memory': True}   # KEY: streaming, low-RAM
+    else:
+        # Standard mod daha hızlı ve string'leri paylaşılan tabloda tekilleştirir
+        options = {'constant_memory': False, 'use_zip64': True}
+    if tmpdir:
+        options['tmpdir'] = tmpdir
+
+    wb = xlsxwriter.Workbook(file_path, options)
+    ws = wb.add_worksheet(sheet_name, worksheet_class=FastWorksheet)
+
+    # Write headers
+    ws.write_row(0, 0, headers)
+
+    # sutun genişiliği ayarı
+    ws.set_column(0, len(headers) - 1, 15)
+
+    # Her batch tek çağrıda yazılır
+    write_rows = ws.write_rows
+    row_index = 1
+    with open(shard_path, 'rb', buffering=SHARD_BUFFER_SIZE) as fh:
+        while True:
+            try:
+                batch = pickle.load(fh)
+            except EOFError:
+                break
+            row_index = write_rows(row_index, batch)
+
+    wb.close()
+    return row_index - 1
+
 
 class ExcelSplitter:
     """
     Memory-safe, high-performance Excel splitter.
-    - Uses XlsxWriter constant_memory mode (true streaming)
-    - Extremely low RAM usage
-    - Async group lookup
+    - Rows are spooled to per-group pickle shards while reading
+    - Output workbooks are built in parallel worker processes
+      (XlsxWriter standard mode when RAM allows, constant_memory otherwise)
+    - Group lookups resolved up front, sync row loop in a worker thread
+    - fast_read=True reads the input with python-calamine when installed.
+      Formulas are then replaced by their cached values, which are empty
+      for files saved by openpyxl (e.g. the cleaner output), so it is off
+      by default.
     """
 
-    def __init__(self, input_path: str, headers: List[str]):
+    def __init__(self, input_path: str, headers: List[str],
+                 constant_memory: Optional[bool] = None,
+                 fast_read: bool = False):
         self.input_path = input_path
         self.headers = headers
+        # None: RAM durumuna göre otomatik seç
+        self.constant_memory = constant_memory
+        # calamine sadece açıkça istenirse ve kuruluysa
+        self.fast_read = fast_read and CalamineWorkbook is not None
 
         # Runtime structures (very small in RAM)
-        self.writers: Dict[str, xlsxwriter.Workbook] = {}
-        self.sheets: Dict[str, Any] = {}
-        self.row_counts: Dict[str, int] = {}
+        # Grup başına sıcak alanlar tek listede:
+        # [shard_fh, pending_rows, pending_rows.append, row_count]
+        # (satır başına dict/attribute lookup yerine tek dict erişimi)
+        self._group_state: Dict[str, list] = {}
+        self._shard_dir: Optional[Path] = None
         self.matched_rows = 0  # İstatistik için
         
-         # Eşleşmeyenler için özel yapı
-        self.unmatched_data: List[tuple] = []  # Eşleşmeyen satırları sakla
-        self.unmatched_cities = set()
+        # Eşleşmeyen satırlar grup_0 shard'ına yazılır (RAM'de tutulmaz),
+        # eşleşmeyen şehirler sonda _city_cache'ten çıkarılır
+
+        # Şehir -> gerçek grup önbelleği: her satırda await yerine dict lookup
+        # (şehir değerleri sayfa boyunca çok tekrar eder)
+        self._city_cache: Dict[Any, tuple] = {}
+        # Çalışma başındaki şehir -> grup eşlemesi (run sırasında refresh_groups
+        # yeni eşleme atasa da bu çalıştırma aynı grup kümesiyle devam eder)
+        self._city_map: Dict[str, List[str]] = {}
+        # Grup -> çıktı dosya yolu (run() başında bir kez çözülür)
+        self._group_files: Dict[str, Path] = {}
 
     # ---------------------------------------------------------
-    # Workbook and sheet creation
+    # Output paths and row shards
     # ---------------------------------------------------------
-    async def _ensure_group_writer(self, group_id: str) -> None:
-        """Create workbook + sheet for group if not exists."""
-        if group_id in self.writers:
-            return
-
-        # Get group info (async)
-        group_info = await group_manager.get_group_info(group_id)
-        filename = await generate_output_filename(group_info)
+    async def _prefetch_group_files(self) -> None:
+        """Resolve output paths for every known group once, before the row loop."""
+        # Eşleme her güncellemede yeni dict olarak atanır; referans sabit bir kopya
+        self._city_map = group_manager.city_to_group
+        group_ids = {
+            g
+            for groups in self._city_map.values()
+            for g in groups
+        }
+        group_ids.add(UNMATCHED_GROUP)
 
         output_dir = config.paths.OUTPUT_DIR
         output_dir.mkdir(parents=True, exist_ok=True)
 
-        file_path = output_dir / filename
+        async def resolve(group_id: str) -> Path:
+            group_info = await group_manager.get_group_info(group_id)
+            return output_dir / await generate_output_filename(group_info)
 
-        # Create streaming workbook
-        wb = xlsxwriter.Workbook(
-            file_path,
-            {'constant_memory': True}   # KEY: streaming, low-RAM
-        )
-        ws = wb.add_worksheet("Veriler")
-
-        # Write headers
-        ws.write_row(0, 0, self.headers)
-        
-        # sutun genişiliği ayarı 
-        ws.set_column(0, len(self.headers) - 1, 15)
-        
-        self.writers[group_id] = wb
-        self.sheets[group_id] = ws
-        self.row_counts[group_id] = 1   # Next row index
+        paths = await asyncio.gather(*(resolve(g) for g in group_ids))
+        self._group_files = dict(zip(group_ids, paths))
 
-        logger.debug(f"Writer created for group {group_id}: {file_path}")
+    def _resolve_tmp_root(self) -> Optional[str]:
+        """Prefer tmpfs for temp files when it exists, has room and is writable, else the default temp dir."""
+        try:
+            if TMPFS_DIR.is_dir():
+                needed = os.path.getsize(self.input_path) * TMPFS_SIZE_FACTOR
+                if shutil.disk_usage(TMPFS_DIR).free >= needed:
+                    tmp_root = TMPFS_DIR / "excel_splitter"
+                    tmp_root.mkdir(exist_ok=True)
+                    # Dizin başka kullanıcıya ait olabilir (0755): yazılamıyorsa diske düş
+                    if os.access(tmp_root, os.W_OK | os.X_OK):
+                        return str(tmp_root)
+                    logger.debug(f"tmpfs dizini yazılabilir değil, varsayılan temp dizini: {tmp_root}")
+        except OSError as e:
+            logger.debug(f"tmpfs kullanılamıyor, varsayılan temp dizini: {e}")
+        return None
+
+    def _open_group_shards(self) -> None:
+        """Open a row shard for every known group up front (no checks in the row loop)."""
+        tmp_root = self._resolve_tmp_root()
+        try:
+            shard_dir = tempfile.mkdtemp(prefix="excel_splitter_", dir=tmp_root)
+        except OSError as e:
+            if tmp_root is None:
+                raise
+            logger.debug(f"tmpfs'te dizin açılamadı, varsayılan temp dizini: {e}")
+            shard_dir = tempfile.mkdtemp(prefix="excel_splitter_")
+        self._shard_dir = Path(shard_dir)
+        for group_id in self._group_files:
+            self._open_group_shard(group_id)
+
+    def _open_group_shard(self, group_id: str) -> None:
+        """Open the row shard for group and register its state."""
+        # Dosya adı grup id'sinden bağımsız (id'de dosya sistemi karakterleri olabilir)
+        shard_path = self._shard_dir / f"shard_{len(self._group_state)}.pkl"
+        shard_fh = open(shard_path, 'wb', buffering=SHARD_BUFFER_SIZE)
+        pending: List[tuple] = []
+        self._group_state[group_id] = [shard_fh, pending, pending.append, 0]
+
+        logger.debug(f"Shard created for group {group_id}: {shard_fh.name}")
+
+    @staticmethod
+    def _flush_shard(state: list) -> None:
+        """Append pending rows of a group to its shard file as one pickle batch."""
+        pending = state[1]
+        if pending:
+            pickle.dump(pending, state[0], pickle.HIGHEST_PROTOCOL)
+            pending.clear()
+
+    def _add_row(self, group_id: str, row: tuple) -> None:
+        state = self._group_state[group_id]
+        state[2](row)
+        state[3] += 1
+        if len(state[1]) >= SHARD_BATCH_ROWS:
+            self._flush_shard(state)
 
     # ---------------------------------------------------------
     # Process one row
     # ---------------------------------------------------------
     # Eşleşmeyen şehirleri de takip et
 
-    async def _process_row(self, row: tuple) -> None:
+    def _process_row_sync(self, row: tuple) -> None:
         """Eşleşmeyen şehirleri ayrı olarak topla"""
-        city = row[1] if len(row) > 1 else None
-        groups = await group_manager.get_groups_for_city(city)
-        
-        # Eşleşme var mı kontrol et
-        has_match = False
-        
-        if groups:
-            for g in groups:
-                if g != "grup_0":  # grup_0 hariç gerçek eşleşme var mı?
-                    has_match = True
-                    await self._ensure_group_writer(g)
-                    ws = self.sheets[g]
-                    row_index = self.row_counts[g]
-                    ws.write_row(row_index, 0, row)
-                    self.row_counts[g] += 1
-                    self.matched_rows += 1
+        # Satırlar başlık genişliğinde gelir; len() kontrolü yerine nadir kısa satırda IndexError
+        try:
+            city = row[CITY_COL]
+        except IndexError:
+            city = None
+        groups = self._city_cache.get(city)
+        if groups is None:
+            groups = self._lookup_city(city)
         
-        # Eşleşme yoksa veya sadece grup_0 varsa
-        if not has_match:
+        # Eşleşme yoksa veya sadece grup_0 varsa: erken çık
+        if not groups:
             if city:
-                self.unmatched_cities.add(city)
-                self.unmatched_data.append(row)  # Eşleşmeyeni sakla
-                
+                self._add_row(UNMATCHED_GROUP, row)  # Eşleşmeyeni sakla
+            return
+        
+        for g in groups:
+            self._add_row(g, row)
+        self.matched_rows += len(groups)
+
+    def _lookup_city(self, city: Any) -> tuple:
+        """Resolve the real groups of a city (cache miss) and cache them."""
+        # Canlı eşleme değil, shard'ları açılmış çalışma başı kopyası kullanılır
+        mapped = self._city_map.get(group_manager.normalize_city_name(city), ())
+        # Önbellekte sadece gerçek gruplar (grup_0 hariç)
+        groups = tuple(g for g in mapped if g != UNMATCHED_GROUP)
+        self._city_cache[city] = groups
+        return groups
+
+    def _dispatch_batch(self, batch: list) -> None:
+        """Dispatch one batch of rows (Cython loop when compiled, else per row)."""
+        if dispatch_rows is None:
+            for row in batch:
+                self._process_row_sync(row)
+            return
+        self.matched_rows += dispatch_rows(
+            batch, self._city_cache, self._group_state, CITY_COL,
+            self._lookup_city, UNMATCHED_GROUP, SHARD_BATCH_ROWS, self._flush_shard,
+        )
 
+    def _open_input_rows(self):
+        """Return (data row iterator, close callback) for the input sheet."""
+        if self.fast_read:
+            wb = CalamineWorkbook.from_path(self.input_path)
+            rows = wb.get_sheet_by_index(0).iter_rows()
+            next(rows, None)  # başlık satırını atla
+            return self._calamine_rows(rows), wb.close
+
+        wb = load_workbook(self.input_path, read_only=True)
+        ws = wb.active
+        # Dosyadaki boyut bilgisi yanlış olabilir; satırlar kesilmesin
+        ws.reset_dimensions()
+        # Sadece başlık genişliği kadar oku (boş sondaki hücreler için nesne üretme)
+        rows = ws.iter_rows(min_row=2, max_col=len(self.headers), values_only=True)
+        return rows, wb.close
+
+    @staticmethod
+    def _calamine_rows(rows):
+        """Yield calamine rows typed like openpyxl's: integral floats as int, empty cells as None."""
+        for row in rows:
+            yield tuple(
+                int(v) if v.__class__ is float and v.is_integer()
+                else None if v == ""
+                else v
+                for v in row
+            )
+
+    def _reader_drain(self, row_queue: queue.Queue) -> None:
+        """Producer: read input rows in batches into the queue (reader thread)."""
+        try:
+            rows, close = self._open_input_rows()
+            try:
+                while batch := list(islice(rows, READ_BATCH_ROWS)):
+                    row_queue.put(batch)
+            finally:
+                close()
+        finally:
+            row_queue.put(None)  # EOF
+
+    def _writer_drain(self, row_queue: queue.Queue) -> int:
+        """Consumer: dispatch queued rows to group shards (processing thread)."""
+        processed_rows = 0
+        # Milyonlarca kısa ömürlü satır tuple'ı için sık gen0 taramaları yerine
+        # yüksek eşik + paket sonunda toplu tarama. Eşik process geneli
+        # (event loop ve diğer thread'ler de etkilenir) ama GC kapatılmaz
+        _raise_gc_threshold()
+        try:
+            while (batch := row_queue.get()) is not None:
+                self._dispatch_batch(batch)
+                processed_rows += len(batch)
+                gc.collect(1)
+        except BaseException:
+            # Okuyucu put() içinde bloklanmasın: kuyruğu EOF'a kadar boşalt
+            while row_queue.get() is not None:
+                pass
+            raise
+        finally:
+            _restore_gc_threshold()
+        return processed_rows
 
     # ---------------------------------------------------------
     # Main streaming executor
@@ -113,18 +427,22 @@ class ExcelSplitter:
         try:
             logger.info("🔄 Group manager initializing…")
             await group_manager._ensure_initialized()
+            await self._prefetch_group_files()
 
-            logger.info("📥 Reading input file…")
-            wb = load_workbook(self.input_path, read_only=True)
-            ws = wb.active
-
-            processed_rows = 0
+            self._open_group_shards()
 
-            for row in ws.iter_rows(min_row=2, values_only=True):
-                await self._process_row(row)
-                processed_rows += 1
-
-            wb.close()
+            logger.info("📥 Reading input file…")
+            # Okuma ve işleme ayrı thread'lerde örtüşür; event loop bloklanmaz
+            row_queue: queue.Queue = queue.Queue(maxsize=READ_QUEUE_SIZE)
+            reader_result, processed_rows = await asyncio.gather(
+                asyncio.to_thread(self._reader_drain, row_queue),
+                asyncio.to_thread(self._writer_drain, row_queue),
+                return_exceptions=True,
+            )
+            # İki thread de bittikten sonra ilk hatayı yükselt
+            for outcome in (reader_result, processed_rows):
+                if isinstance(outcome, BaseException):
+                    raise outcome
 
             logger.info(f"✔ Processing complete. Total rows processed: {processed_rows}")
 
@@ -139,91 +457,154 @@ class ExcelSplitter:
                 "output_files": {},
             }
 
+        finally:
+            self._cleanup_shards()
+
     # ---------------------------------------------------------
-    # Save & close writers
+    # Build workbooks from shards
     # ---------------------------------------------------------
 
+    async def _build_workbooks(self, jobs: Dict[str, tuple]) -> Dict[str, Any]:
+        """
+        Run _write_group_workbook for every job; each group file is independent,
+        so they are serialized in parallel worker processes.
+        """
+        if len(jobs) == 1:
+            # Tek dosya için process başlatmaya değmez
+            group_id, args = next(iter(jobs.items()))
+            try:
+                return {group_id: await asyncio.to_thread(_write_group_workbook, *args)}
+            except Exception as e:
+                return {group_id: e}
+
+        loop = asyncio.get_running_loop()
+        max_workers = min(len(jobs), os.cpu_count() or 1)
+        pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context(MP_START_METHOD),
+        )
+        try:
+            futures = [
+                loop.run_in_executor(pool, _write_group_workbook, *args)
+                for args in jobs.values()
+            ]
+            results = await asyncio.gather(*futures, return_exceptions=True)
+        except BaseException:
+            # İptal (bot kapanışı, timeout): event loop worker'ları beklemesin
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        # İşler bitti; process'lerin kapanmasını event loop dışında bekle
+        await asyncio.to_thread(pool.shutdown)
+
+        return dict(zip(jobs, results))
+
+    def _choose_constant_memory(self, row_counts: Dict[str, int]) -> Dict[str, bool]:
+        """
+        Pick the write mode per workbook. Smallest groups get standard mode
+        (shared string table dedupes repeated city/group strings) while their
+        combined estimate fits in the RAM budget; the rest stream with
+        constant_memory. Workbooks are built in parallel, so the budget is shared.
+        """
+        if self.constant_memory is not None:
+            return {group_id: self.constant_memory for group_id in row_counts}
+
+        budget = psutil.virtual_memory().available * MEMORY_BUDGET_RATIO
+        bytes_per_row = len(self.headers) * BYTES_PER_CELL
+
+        modes = {}
+        used = 0
+        for group_id in sorted(row_counts, key=row_counts.get):
+            estimated_bytes = row_counts[group_id] * bytes_per_row
+            if used + estimated_bytes <= budget:
+                used += estimated_bytes
+                modes[group_id] = False
+            else:
+                modes[group_id] = True
+        return modes
+
     async def _finalize(self, processed_rows: int) -> Dict[str, Any]:
         output_files = {}
-        
-        # 1. Önce normal dosyaları kaydet
-        for group_id, wb in self.writers.items():
-            try:
-                row_count = self.row_counts[group_id] - 1
-                
-                # Eğer sadece başlık varsa, dosyayı kapat ve sil
-                if row_count <= 0:
-                    ws_path = Path(wb.filename)
-                    wb.close()
-                    if ws_path.exists():
-                        ws_path.unlink()
-                        logger.info(f"🗑️ Deleted empty file: {ws_path.name}")
-                    continue
-                    
-                wb.close()
-                ws_path = Path(wb.filename)
+        row_counts: Dict[str, int] = {}
+
+        # 1. Shard'ları kapat, grup_0 (eşleşmeyenler) en sona
+        group_ids = sorted(self._group_state, key=lambda g: g == UNMATCHED_GROUP)
+        for group_id in group_ids:
+            state = self._group_state[group_id]
+            self._flush_shard(state)
+            state[0].close()
+
+            # Sadece başlık olacaksa dosya hiç oluşturulmaz
+            if state[3] > 0:
+                row_counts[group_id] = state[3]
+
+        # 2. Workbook başına yazma modu
+        constant_memory = self._choose_constant_memory(row_counts)
+        logger.debug(f"XlsxWriter constant_memory: {constant_memory}")
+
+        jobs: Dict[str, tuple] = {
+            group_id: (
+                str(self._group_files[group_id]),
+                "Eşleşmeyenler" if group_id == UNMATCHED_GROUP else "Veriler",
+                self.headers,
+                self._group_state[group_id][0].name,
+                constant_memory[group_id],
+                str(self._shard_dir),
+            )
+            for group_id in row_counts
+        }
 
-                output_files[group_id] = {
-                    "filename": ws_path.name,
-                    "path": ws_path,
-                    "row_count": row_count,
-                }
+        # 3. Workbook'ları paralel oluştur
+        results = await self._build_workbooks(jobs) if jobs else {}
 
-                logger.info(f"📄 Saved: {ws_path.name} ({row_count} rows)")
+        for group_id, result in results.items():
+            file_path = self._group_files[group_id]
+            row_count = row_counts[group_id]
 
-            except Exception as e:
-                logger.error(f"Error closing workbook for {group_id}: {e}")
-        
-        # 2. Eşleşmeyen veriler varsa, grup_0 dosyası oluştur
-        if self.unmatched_data:
-            group_id = "grup_0"
-            try:
-                # grup_0 için dosya oluştur
-                group_info = await group_manager.get_group_info(group_id)
-                filename = await generate_output_filename(group_info)
-                
-                output_dir = config.paths.OUTPUT_DIR
-                file_path = output_dir / filename
-                
-                # Eşleşmeyenler için workbook oluştur
-                wb = xlsxwriter.Workbook(
-                    file_path,
-                    {'constant_memory': True}
-                )
-                ws = wb.add_worksheet("Eşleşmeyenler")
-                
-                # Başlıkları yaz
-                ws.write_row(0, 0, self.headers)
-                # sutun genişliği
-                ws.set_column(0, len(self.headers) - 1, 15)
-                
-                # Eşleşmeyen verileri yaz
-                row_index = 1
-                for row in self.unmatched_data:
-                    ws.write_row(row_index, 0, row)
-                    row_index += 1
-                
-                wb.close()
-                
-                output_files[group_id] = {
-                    "filename": filename,
-                    "path": file_path,
-                    "row_count": len(self.unmatched_data),
-                }
-                
-                logger.info(f"📄 Eşleşmeyenler dosyası oluşturuldu: {filename} ({len(self.unmatched_data)} satır)")
-                
-            except Exception as e:
-                logger.error(f"Eşleşmeyenler dosyası oluşturulurken hata: {e}")
-        
+            if isinstance(result, Exception):
+                if group_id == UNMATCHED_GROUP:
+                    logger.error(f"Eşleşmeyenler dosyası oluşturulurken hata: {result}")
+                else:
+                    logger.error(f"Error closing workbook for {group_id}: {result}")
+                continue
+
+            output_files[group_id] = {
+                "filename": file_path.name,
+                "path": file_path,
+                "row_count": row_count,
+            }
+
+            if group_id == UNMATCHED_GROUP:
+                logger.info(f"📄 Eşleşmeyenler dosyası oluşturuldu: {file_path.name} ({row_count} satır)")
+            else:
+                logger.info(f"📄 Saved: {file_path.name} ({row_count} rows)")
+
+        unmatched_state = self._group_state.get(UNMATCHED_GROUP)
         return {
             "success": True,
             "total_rows": processed_rows,
             "matched_rows": self.matched_rows,
-            "unmatched_rows": len(self.unmatched_data),  # Yeni: eşleşmeyen satır sayısı
+            "unmatched_rows": unmatched_state[3] if unmatched_state else 0,  # Yeni: eşleşmeyen satır sayısı
             "output_files": output_files,
-            "unmatched_cities": list(self.unmatched_cities),
+            "unmatched_cities": self._unmatched_cities(),
         }
+
+    def _unmatched_cities(self) -> List[Any]:
+        """Distinct non-empty cities without a real group, from the per-run cache."""
+        return [
+            city
+            for city, groups in self._city_cache.items()
+            if city and not groups
+        ]
+
+    def _cleanup_shards(self) -> None:
+        """Close any open shard and remove the temp shard directory."""
+        for state in self._group_state.values():
+            if not state[0].closed:
+                state[0].close()
+
+        if self._shard_dir is not None:
+            shutil.rmtree(self._shard_dir, ignore_errors=True)
+            self._shard_dir = None
         
 
 # ---------------------------------------------------------
@@ -231,12 +612,16 @@ class ExcelSplitter:
 # ---------------------------------------------------------
 # ASYNC arayüz fonksiyonu
 #async def split_excel_by_groups_streaming
-async def split_excel_by_groups(input_path: str, headers: List[str]) -> Dict[str, Any]:
-    splitter = ExcelSplitter(input_path, headers)
+async def split_excel_by_groups(input_path: str, headers: List[str],
+                                constant_memory: Optional[bool] = None,
+                                fast_read: bool = False) -> Dict[str, Any]:
+    splitter = ExcelSplitter(input_path, headers, constant_memory, fast_read)
     return await splitter.run()
 
 # SYNC arayüz (backward compatibility)
 # def split_excel_by_groups_streaming_sync
-def split_excel_by_groups_sync(input_path: str, headers: List[str]) -> Dict[str, Any]:
+def split_excel_by_groups_sync(input_path: str, headers: List[str],
+                               constant_memory: Optional[bool] = None,
+                               fast_read: bool = False) -> Dict[str, Any]:
     """Sync wrapper."""
-    return asyncio.run(split_excel_by_groups(input_path, headers))
+    return asyncio.run(split_excel_by_groups(input_path, headers, constant_memory, fast_read))
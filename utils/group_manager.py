@@ -193,10 +193,13 @@ class GroupManager:
     async def get_groups_for_city(self, city_name: str) -> List[str]:
         """Şehir için grupları bul - async"""
         await self._ensure_initialized()
-        
+        return self.lookup_groups_for_city(city_name)
+
+    def lookup_groups_for_city(self, city_name: str) -> List[str]:
+        """Şehir için grupları bul - sync (başlatılmış olmalı, hot loop için)"""
         if not city_name:
             return ["grup_0"]
-        
+
         normalized_city = self.normalize_city_name(city_name)
         return self.city_to_group.get(normalized_city, ["grup_0"])
 
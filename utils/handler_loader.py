@@ -18,8 +18,11 @@ Aiogram 3.x handler’larını hızlı ve basit bir şekilde yüklemek için ide
     result = await load_handlers(dp, "handlers")
 """
 
-import importlib.util
+import asyncio
+import importlib
 import logging
+import os
+import pkgutil
 import sys
 from pathlib import Path
 from typing import List, Optional, Dict, Any
@@ -28,6 +31,24 @@ from aiogram import Dispatcher, Router
 
 logger = logging.getLogger(__name__)
 
+# Geliştirme için: zaten import edilmiş handler modüllerini yeniden yükle
+RELOAD_HANDLERS = os.getenv("HANDLER_RELOAD", "False").lower() == "true"
+
+# Router kayıt sırası: aiogram'da ilk eşleşen handler kazanır, sıra davranıştır.
+# Listede olmayan modüller sona, alfabetik eklenir.
+# - pex: waiting_for_files state'indeki "🛑 DUR"/iptal kendi handler'ına gitsin
+# - reply: klavye butonları ("🛑 DUR", "Temizle", "PEX", "Js", "istatistik") ve /r,
+#   admin'in aynı filtreleri ile kova/json'un state catch-all'larından önce
+HANDLER_PRIORITY = [
+    "pex_handler",
+    "dar_handler",
+    "reply_handler",
+    "file_handler",
+    "json_handler",
+    "admin_handler",
+    "kova_handler",
+]
+
 @dataclass
 class LoadResult:
     """Loading result - sadece gerekli metrikler."""
@@ -51,18 +72,27 @@ class LoadResult:
 class HandlerLoader:
     """
     TEK SEÇERLİK YÜKLEME için optimize edilmiş Handler Loader.
-    Cache YOK, thread pool YOK, complexity YOK.
+    Cache YOK, complexity YOK. Import'lar thread'lerde paralel,
+    router ekleme sırayla.
     """
     
     def __init__(
         self,
         dispatcher: Dispatcher,
         base_path: str = "handlers",
-        handler_dirs: Optional[List[str]] = None
+        handler_dirs: Optional[List[str]] = None,
+        priority: Optional[List[str]] = None
     ):
         self.dispatcher = dispatcher
         self.base_dir = Path(base_path).resolve()
         self.handler_dirs = handler_dirs or ["commands", "callbacks", "admin", "states"]
+        # Modül adı -> kayıt sırası
+        self.priority = {name: i for i, name in enumerate(priority or HANDLER_PRIORITY)}
+        
+        # Handler'lar paket olarak import edilir: üst dizin sys.path'te olmalı
+        parent_dir = str(self.base_dir.parent)
+        if parent_dir not in sys.path:
+            sys.path.insert(0, parent_dir)
         
         logger.info(f"🔄 HandlerLoader başlatıldı: {self.base_dir}")
     
@@ -126,9 +156,15 @@ class HandlerLoader:
     async def _load_handlers_from_dir(self, dir_path: Path, dispatcher: Dispatcher, result: LoadResult):
         """Bir dizindeki handler dosyalarını yükle."""
         try:
-            # .py dosyalarını bul
-            py_files = list(dir_path.glob("*.py"))
-            py_files = [f for f in py_files if not f.name.startswith("_")]
+            # .py modüllerini bul (import sisteminin dizin önbelleği ile)
+            module_names = [
+                module_info.name
+                for module_info in pkgutil.iter_modules([str(dir_path)])
+                if not module_info.ispkg and not module_info.name.startswith("_")
+            ]
+            # Kayıt sırası HANDLER_PRIORITY'den (dosya sistemi sırasına bağlı değil)
+            module_names.sort(key=lambda name: (self.priority.get(name, len(self.priority)), name))
+            py_files = [dir_path / f"{name}.py" for name in module_names]
             
             if not py_files:
                 return
@@ -136,22 +172,29 @@ class HandlerLoader:
             rel_path = dir_path.relative_to(self.base_dir)
             logger.info(f"📁 {rel_path}: {len(py_files)} dosya")
             
-            # Dosyaları sırayla işle (basit tut)
-            for file_path in py_files:
+            # Import'lar paralel (kaynak okuma/.pyc yükleme örtüşür)
+            modules = await asyncio.gather(
+                *(asyncio.to_thread(self._import_and_collect, file_path) for file_path in py_files)
+            )
+            
+            # Dispatcher'a ekleme sırayla (tek thread, dosya sırası korunur)
+            for file_path, module in zip(py_files, modules):
                 result.scanned += 1
-                await self._load_single_handler(file_path, dispatcher, result)
+                self._register_handler(file_path, module, dispatcher, result)
                 
         except Exception as e:
             logger.error(f"📂 {dir_path.name} tarama hatası: {e}")
     
-    async def _load_single_handler(self, file_path: Path, dispatcher: Dispatcher, result: LoadResult):
-        """Tek bir handler dosyasını yükle."""
+    def _import_and_collect(self, file_path: Path):
+        """Tek bir handler modülünü import et (worker thread'de çalışır)."""
+        # Paket içi modül adı (handlers.commands.start)
+        module_name = self._generate_module_name(file_path)
+        return self._import_module_safely(file_path, module_name)
+    
+    def _register_handler(self, file_path: Path, module, dispatcher: Dispatcher, result: LoadResult):
+        """Import edilmiş handler modülünün router'ını ekle."""
         try:
-            # Modül adı oluştur (sadece logging için)
-            module_name = self._generate_module_name(file_path)
-            
-            # 1. Modülü import et
-            module = self._import_module_safely(file_path, module_name)
+            # 1. Import başarılı mı
             if module is None:
                 result.failed += 1
                 return
@@ -186,35 +229,22 @@ class HandlerLoader:
     def _import_module_safely(self, file_path: Path, module_name: str):
         """Güvenli modül import."""
         try:
-            # Eski modülü temizle (güvenlik için)
-            if module_name in sys.modules:
-                del sys.modules[module_name]
-            
-            # Spec oluştur
-            spec = importlib.util.spec_from_file_location(module_name, file_path)
-            if spec is None or spec.loader is None:
-                logger.error(f"⚠️ Spec oluşturulamadı: {file_path.name}")
-                return None
+            # Dev modunda zaten yüklü modülü kaynaktan yeniden çalıştır
+            if RELOAD_HANDLERS and module_name in sys.modules:
+                return importlib.reload(sys.modules[module_name])
             
-            # Modülü oluştur ve yükle
-            module = importlib.util.module_from_spec(spec)
-            sys.modules[module_name] = module
-            spec.loader.exec_module(module)
-            
-            return module
+            # Standart import mekanizması ile yükle (.pyc önbelleği kullanılır)
+            return importlib.import_module(module_name)
             
         except Exception as e:
             logger.error(f"⚠️ Import hatası {file_path.name}: {e}")
             return None
     
     def _generate_module_name(self, file_path: Path) -> str:
-        """Basit modül adı oluştur."""
-        try:
-            rel_path = file_path.relative_to(self.base_dir)
-            # Örnek: handlers/commands/start.py -> handlers_commands_start
-            return f"handlers_{str(rel_path.with_suffix('')).replace('/', '_')}"
-        except:
-            return f"handlers_{file_path.stem}"
+        """Paket içi (noktalı) modül adı oluştur."""
+        rel_path = file_path.relative_to(self.base_dir)
+        # Örnek: handlers/commands/start.py -> handlers.commands.start
+        return ".".join((self.base_dir.name,) + rel_path.with_suffix('').parts)
     
     def _log_summary(self, result: LoadResult):
         """Sonuçları özetle."""